@@ -1,9 +1,11 @@
+import numpy as np
 import pandas as pd
 import networkx as nx
 import altair as alt
 
-from math import atan2, sin, cos, pi, sqrt
+from math import sin, cos, pi
 from itertools import chain
+from collections.abc import Mapping
 
 from .util import despine
 
@@ -18,12 +20,14 @@ def to_pandas_nodes(G: nx.Graph, pos: dict[..., tuple[float, float]]):
     :return: A pandas DataFrame of nodes.
     '''
     assert not (overlap := set(chain.from_iterable(G.nodes[n].keys() for n in G.nodes)).intersection(avoid := ['node', 'x', 'y'])), f'nodes in G should not have attributes named any of {avoid}; overlapping attributes: {overlap}'
-    return pd.DataFrame([dict(node = n, x = pos[n][0], y = pos[n][1], **G.nodes[n]) for n in G.nodes], index = G.nodes)
+    nodes = list(G.nodes)
+    xy = pos.take(nodes).tolist() if isinstance(pos, _PosView) else (pos[n] for n in nodes)
+    return pd.DataFrame([dict(node = n, x = p[0], y = p[1], **G.nodes[n]) for n, p in zip(nodes, xy)], index = nodes)
 
 
 
 def to_pandas_edges(G: nx.Graph, pos: dict[..., tuple[float, float]], control_points: list[tuple[float, float]] = None,
-    loop_radius = .05, loop_angle = 90., loop_n_points = 30):
+    loop_radius = .05, loop_angle = 90., loop_n_points = 30, include_self_loops = True):
     '''Convert Graph edges to pandas DataFrame meant for drawing with Altair.
 
     :param G: The graph to draw.
@@ -41,64 +45,44 @@ def to_pandas_edges(G: nx.Graph, pos: dict[..., tuple[float, float]], control_po
         (in the straight-edge case, respectively: a short segment, a triangle, and a square).
         NOTE: to draw straight edges but interpolation-curved loops (rather than by high manual point count), set control_points to [] rather than None
         (or really any list of points whose 2nd coordinate is 0).
+    :param include_self_loops: Whether to include edges starting and ending on the same node; excluding them here avoids having to copy G just to remove them.
 
     :return: A pandas DataFrame of edges.
     '''
     assert not (overlap := set(chain.from_iterable(G.edges[n].keys() for n in G.edges)).intersection(avoid := ['edge', 'order', 'source', 'target', 'pair', 'x', 'y'])), f'edges in G should not have attributes named any of {avoid}; overlapping attributes: {overlap}'
     loop_angle *= pi / 180
 
-    rows = []
-    for i, e in enumerate(G.edges):
-        Dx = pos[e[1]][0] - pos[e[0]][0]
-        Dy = pos[e[1]][1] - pos[e[0]][1]
-        D = sqrt(Dx ** 2 + Dy ** 2)
-        angle = atan2(Dy, Dx)
-        order = 0
-
-        rows.append(dict(
-            edge = i, order = order,
-            source = e[0], target = e[1], pair = e,
-            x = pos[e[0]][0], y = pos[e[0]][1],
-            **G.edges[e]
-        ))
-        order += 1
-
-        if e[0] == e[1]:
-            centre_x = pos[e[0]][0] + loop_radius * cos(loop_angle)
-            centre_y = pos[e[0]][1] + loop_radius * sin(loop_angle)
-            for n in range(1, loop_n_points): # Pairs of relative coordinates: (D proportion parallel to D, D proportion perpendicular to D)
-                point_angle = (loop_angle - pi + n * 2 * pi / loop_n_points) % (2 * pi)
-                rows.append(dict(
-                    edge = i, order = order,
-                    source = e[0], target = e[1], pair = e,
-                    x = centre_x + loop_radius * cos(point_angle),
-                    y = centre_y + loop_radius * sin(point_angle),
-                    **G.edges[e]
-                ))
-                order += 1
-        elif control_points:
-            for v, w in control_points: # Pairs of relative coordinates: (D proportion parallel to D, D proportion perpendicular to D)
-                rows.append(dict(
-                    edge = i, order = order,
-                    source = e[0], target = e[1], pair = e,
-                    x = pos[e[0]][0] + D * (v * cos(angle) - w * sin(angle)),
-                    y = pos[e[0]][1] + D * (v * sin(angle) + w * cos(angle)),
-                    **G.edges[e]
-                ))
-                order += 1
-
-        rows.append(dict(
-            edge = i, order = order,
-            source = e[0], target = e[1], pair = e,
-            x = pos[e[1]][0], y = pos[e[1]][1],
-            **G.edges[e]
-        ))
-
-    return pd.DataFrame(rows)
-
-
-
-def to_pandas_edge_arrows(G: nx.Graph, pos: dict[..., tuple[float, float]], length: float, length_is_relative = False, control_points: list[tuple[float, float]] = None):
+    edges = list(G.edges) if include_self_loops else [e for e in G.edges if e[0] != e[1]]
+    src, dst = _endpoint_coordinates(edges, pos)
+    is_loop = np.fromiter((e[0] == e[1] for e in edges), dtype = bool, count = len(edges))
+
+    # Each edge is drawn through its source, its intermediate points and its target; build all point coordinates per edge type as (n_edges_of_type, n_points) arrays
+    #   Self-loop points relative to their node (i.e. around a centre at loop_radius from it) are the same for every loop, hence computed once
+    loop_point_angles = loop_angle - pi + np.arange(1, loop_n_points) * 2 * pi / loop_n_points
+    loop_dxs = np.concatenate(([0.], loop_radius * (cos(loop_angle) + np.cos(loop_point_angles)), [0.]))
+    loop_dys = np.concatenate(([0.], loop_radius * (sin(loop_angle) + np.sin(loop_point_angles)), [0.]))
+    loop_xs, loop_ys = src[is_loop][:, [0]] + loop_dxs, src[is_loop][:, [1]] + loop_dys
+
+    other_src, other_dst = src[~is_loop], dst[~is_loop]
+    control_xs, control_ys = _control_point_coordinates(other_src, other_dst, control_points or [])
+    other_xs = np.column_stack((other_src[:, 0], control_xs, other_dst[:, 0]))
+    other_ys = np.column_stack((other_src[:, 1], control_ys, other_dst[:, 1]))
+
+    # Interleave the two edge types' points back into edge order
+    n_points = np.where(is_loop, loop_xs.shape[1], other_xs.shape[1])
+    starts = np.cumsum(n_points) - n_points
+    xs, ys = np.empty(n_points.sum()), np.empty(n_points.sum())
+    for mask, type_xs, type_ys in ((is_loop, loop_xs, loop_ys), (~is_loop, other_xs, other_ys)):
+        rows = starts[mask, None] + np.arange(type_xs.shape[1])
+        xs[rows], ys[rows] = type_xs, type_ys
+
+    edge_index = np.repeat(np.arange(len(edges), dtype = 'int32'), n_points)
+    return _edges_dataframe(G, edges, edge_index, xs, ys, order = np.arange(len(xs), dtype = 'int32') - np.repeat(starts, n_points).astype('int32'))
+
+
+
+def to_pandas_edge_arrows(G: nx.Graph, pos: dict[..., tuple[float, float]], length: float, length_is_relative = False, control_points: list[tuple[float, float]] = None,
+    include_self_loops = True):
     '''Convert Graph edge arrows to pandas DataFrame meant for drawing with Altair.
 
     Note that arrows are not drawn for self-loops since they would convey no extra information (and also to avoid unnecessary clutter).
@@ -111,41 +95,107 @@ def to_pandas_edge_arrows(G: nx.Graph, pos: dict[..., tuple[float, float]], leng
     :param control_points: Points to insert in the dataframe between the source and target point rows of each edge; they should be expressed as a tuple of coordinates relative to their straight edge:
         (proportion of edge length parallel to the edge, proportion of edge length perpendicular (anticlockwise) to the edge).
         E.g. [(.5, .1)] is a single control point halfway along the edge and .1 of its length to the left of it.
+    :param include_self_loops: Whether self-loops count towards the 'edge' numbering, which then matches that of `to_pandas_edges` with the same argument
+        (their arrows are never drawn regardless).
 
     :return: A pandas DataFrame of edge arrows.
     '''
     assert not (overlap := set(chain.from_iterable(G.edges[n].keys() for n in G.edges)).intersection(avoid := ['edge', 'order', 'source', 'target', 'pair', 'x', 'y'])), f'edges in G should not have attributes named any of {avoid}; overlapping attributes: {overlap}'
 
-    rows = []
-    for i, e in enumerate(G.edges):
-        if e[0] != e[1]: # Arrows convey no extra information in self-loops
-            Dx = pos[e[1]][0] - pos[e[0]][0]
-            Dy = pos[e[1]][1] - pos[e[0]][1]
-            D = sqrt(Dx ** 2 + Dy ** 2)
-            angle = atan2(Dy, Dx)
-
-            if control_points: # Shift direction from the source point to the last control point
-                v, w = control_points[-1]
-                Dx = pos[e[1]][0] - (pos[e[0]][0] + D * (v * cos(angle) - w * sin(angle)))
-                Dy = pos[e[1]][1] - (pos[e[0]][1] + D * (v * sin(angle) + w * cos(angle)))
-                angle = atan2(Dy, Dx)
-
-            rows.append(dict(
-                edge = i,
-                source = e[0], target = e[1], pair = e,
-                x = pos[e[1]][0], y = pos[e[1]][1],
-                **G.edges[e]
-            ))
-
-            rows.append(dict(
-                edge = i, # Yes, if arrow_length_is_relative Dx & Dy are reassembled from D and cos & sin; this is to keep the same expression regardless of control_points
-                source = e[0], target = e[1], pair = e,
-                x = pos[e[1]][0] - length * (D if length_is_relative else 1) * cos(angle),
-                y = pos[e[1]][1] - length * (D if length_is_relative else 1) * sin(angle),
-                **G.edges[e]
-            ))
-
-    return pd.DataFrame(rows)
+    edges = list(G.edges) if include_self_loops else [e for e in G.edges if e[0] != e[1]]
+    src, dst = _endpoint_coordinates(edges, pos)
+    keep = np.fromiter((e[0] != e[1] for e in edges), dtype = bool, count = len(edges)) # Arrows convey no extra information in self-loops
+    src, dst = src[keep], dst[keep]
+
+    # The arrow points from the last control point (if any; the source otherwise) to the target, and its length may be relative to the (straight) edge length
+    tail = np.stack(_control_point_coordinates(src, dst, control_points[-1:]), axis = -1)[:, 0] if control_points else src
+    angles = np.arctan2(dst[:, 1] - tail[:, 1], dst[:, 0] - tail[:, 0])
+    lengths = length * (np.hypot(*(dst - src).T) if length_is_relative else 1)
+
+    # Two rows per arrow: its tip (the target) and its base
+    xs = np.column_stack((dst[:, 0], dst[:, 0] - lengths * np.cos(angles))).ravel()
+    ys = np.column_stack((dst[:, 1], dst[:, 1] - lengths * np.sin(angles))).ravel()
+    return _edges_dataframe(G, edges, np.repeat(np.flatnonzero(keep).astype('int32'), 2), xs, ys)
+
+
+
+class _PosView(Mapping):
+    '''Read-only node-position mapping backed by a single (n_nodes, 2) array, as produced by the coordinate scaling of draw_networkx.
+    It behaves like the usual dict of positions, but also lets the positions of many nodes be gathered at once by integer indexing (see take)
+    instead of converting one tuple per lookup.
+    '''
+    __slots__ = ('index', 'xy')
+
+    def __init__(self, nodes: list, xy: np.ndarray):
+        self.index = {n: i for i, n in enumerate(nodes)}
+        self.xy = xy
+
+    def __getitem__(self, node): return tuple(self.xy[self.index[node]].tolist())
+    def __iter__(self): return iter(self.index)
+    def __len__(self): return len(self.index)
+
+    def take(self, nodes: list):
+        '''Positions of the given nodes as an (n_nodes, 2) array.
+        '''
+        index = self.index
+        return self.xy[np.fromiter((index[n] for n in nodes), dtype = np.intp, count = len(nodes))]
+
+
+
+def _as_positions(pos: dict[..., tuple[float, float]] | tuple[list, np.ndarray]):
+    '''Node positions given as a pair of a node list and an (n_nodes, 2) array of their coordinates as a _PosView (without building a dict), and any other (i.e. mapping) form of them as they are.
+    '''
+    if not isinstance(pos, tuple): return pos
+    nodes, xy = list(pos[0]), np.asarray(pos[1], dtype = float).reshape(-1, 2)
+    if len(nodes) != len(xy): raise ValueError(f'pos was given as a pair of nodes and coordinates of different lengths ({len(nodes)} and {len(xy)}).')
+    return _PosView(nodes, xy)
+
+
+
+def _endpoint_coordinates(edges: list[tuple], pos: dict[..., tuple[float, float]]):
+    '''Source and target coordinates of the given edges, as two (n_edges, 2) arrays.
+    '''
+    if isinstance(pos, _PosView): return pos.take([e[0] for e in edges]), pos.take([e[1] for e in edges])
+    return (np.array([pos[e[0]] for e in edges], dtype = float).reshape(-1, 2),
+        np.array([pos[e[1]] for e in edges], dtype = float).reshape(-1, 2))
+
+
+
+def _control_point_coordinates(src: np.ndarray, dst: np.ndarray, control_points: list[tuple[float, float]]):
+    '''Absolute coordinates of the given edge-relative control points (see to_pandas_edges) for all edges at once, as two (n_edges, n_control_points) arrays of xs and ys.
+    Since both relative coordinates are proportions of the edge length, the basis is simply the edge vector and its anticlockwise perpendicular.
+    '''
+    v, w = np.asarray(control_points, dtype = float).reshape(-1, 2).T
+    Dx, Dy = (dst - src).T[:, :, None]
+    return src[:, [0]] + v * Dx - w * Dy, src[:, [1]] + v * Dy + w * Dx
+
+
+
+def _repeat_node_names(names: list, codes: np.ndarray):
+    '''Repeat the given per-edge node names into per-row ones (following codes, which index into names).
+    The result is categorical, so that each repeated name is stored as a small integer code rather than an object per row, UNLESS the names are numeric:
+    these are already compact, and Altair would infer categorical ones as nominal rather than quantitative.
+    '''
+    names = pd.Series(names)
+    return names.to_numpy()[codes] if pd.api.types.is_numeric_dtype(names) else pd.Categorical(names).take(codes)
+
+
+
+def _edges_dataframe(G: nx.Graph, edges: list[tuple], edge_index: np.ndarray, xs: np.ndarray, ys: np.ndarray, order: np.ndarray = None):
+    '''Assemble an edge (or edge arrow) dataframe in one go from the (int32) index into edges, the coordinates and (optionally) the point order of each of its rows,
+    repeating the per-edge columns (node names and edge attributes) accordingly.
+    'pair' is categorical, since each edge spans multiple rows and subsetting is much faster on integer category codes than on tuples ('source' and 'target' are too, unless numeric; see _repeat_node_names).
+    Coordinates are deliberately left as float64, since float32 values are serialised to longer (and noisier) JSON numbers by Altair.
+    '''
+    used, codes = np.unique(edge_index, return_inverse = True) # only the edges which are present contribute (attribute) columns
+    used_edges = [edges[i] for i in used]
+    sources, targets = (_repeat_node_names([e[i] for e in used_edges], codes) for i in (0, 1))
+    generated = pd.DataFrame(dict(
+        edge = edge_index, **({} if order is None else dict(order = order)),
+        source = sources, target = targets, pair = pd.Categorical.from_codes(codes, categories = pd.Index(used_edges, tupleize_cols = False)),
+        x = xs, y = ys
+    ))
+    return pd.concat((generated, pd.DataFrame([G.edges[e] for e in used_edges]).take(codes).reset_index(drop = True)), axis = 1)
 
 
 
@@ -1,18 +1,96 @@
+import numpy as np
+import pandas as pd
 import altair as alt
 import networkx as nx
+import json
 
-from copy import deepcopy
+from itertools import chain
+from collections import Counter
+from altair.utils.schemapi import debug_mode
 
-from .core import to_pandas_edges, to_pandas_edge_arrows, to_pandas_nodes
+from .core import to_pandas_edges, to_pandas_edge_arrows, to_pandas_nodes, _PosView, _as_positions
+from .layout import default_layout
 
 
-def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None,
+_VALIDATED_SPECS: set[tuple[type, str]] = set()
+
+
+def _schema_object(schema_class: type, **kwds):
+    '''Construct an Altair schema object (e.g. alt.Scale or alt.MarkDef), validating any given specification only the first time it is seen.
+    Altair validates most schema objects against the full Vega-Lite schema on every instantiation, which dominates the cost of constructing them;
+    a fresh object is still returned on every call, so that charts do not share (mutable) objects.
+    '''
+    with debug_mode(False): obj = schema_class(**kwds)
+    try: key = schema_class, json.dumps(obj.to_dict(validate = False), sort_keys = True)
+    except TypeError: key = None # not JSON-serialisable, hence not memoisable
+
+    if key not in _VALIDATED_SPECS:
+        obj.to_dict(validate = True) # raises an informative SchemaValidationError if invalid
+        if key is not None:
+            if len(_VALIDATED_SPECS) >= 1024: _VALIDATED_SPECS.clear()
+            _VALIDATED_SPECS.add(key)
+    return obj
+
+
+
+def _mark_and_encode(chart: alt.Chart, mark_type: str, marker_attrs: dict[str, ...], encoded_attrs: dict[str, ...]):
+    '''Equivalent to `chart.mark_<mark_type>(**marker_attrs).encode(**encoded_attrs)`, but with the validation of the mark definition memoised (see _schema_object).
+    '''
+    chart = chart.encode(**encoded_attrs) # a copy; the given chart is not modified
+    chart.mark = _schema_object(alt.MarkDef, type = mark_type, **marker_attrs)
+    return chart
+
+
+
+def _url_data(df: pd.DataFrame, data_url: str):
+    '''Write df to the (JSON) file data_url and return a reference to it.
+    '''
+    return alt.UrlData(**alt.to_json(df, filename = data_url.replace('{', '{{').replace('}', '}}'))) # braces would otherwise be filename template fields
+
+
+
+def _reference_data(chart: alt.Chart, url_data: alt.UrlData):
+    '''Replace the (dataframe) data of chart with url_data, so that its rows are not embedded in the chart spec.
+    The types of encoded fields are resolved against the dataframe first, since Altair can only infer them from dataframes.
+    '''
+    chart.encoding = alt.FacetedEncoding.from_dict(chart.encoding.to_dict(validate = False, context = dict(data = chart.data)), validate = False)
+    chart.data = url_data
+
+
+
+def _select_pairs(df_edges: pd.DataFrame, subset: list):
+    '''Restrict an edge (or edge arrow) dataframe to the rows whose 'pair' is in subset,
+    matching the (few) subset pairs to category codes once instead of hashing every row of a (possibly not yet categorical) 'pair' column.
+    '''
+    pairs = df_edges['pair'] if isinstance(df_edges['pair'].dtype, pd.CategoricalDtype) else df_edges['pair'].astype('category')
+    wanted = pairs.cat.categories.get_indexer(subset)
+    return df_edges.loc[np.isin(pairs.cat.codes.to_numpy(), wanted[wanted >= 0])]
+
+
+
+def _select_nodes(df_nodes: pd.DataFrame, subset: list):
+    '''Restrict a node dataframe to the rows whose (node-name) index is in subset, through a single hash-table join and positional gather rather than label-based indexing;
+    nodes not in the dataframe are ignored.
+    '''
+    idx = df_nodes.index.get_indexer(subset)
+    return df_nodes.take(idx[idx >= 0])
+
+
+
+def _tooltip_channels(tooltip: list[str] | str):
+    '''Wrap tooltip attribute names in Tooltip channels, since Altair's own wrapping of shorthand strings in `.encode` is far slower than constructing them directly.
+    '''
+    return alt.Tooltip(tooltip) if isinstance(tooltip, str) else [alt.Tooltip(t) if isinstance(t, str) else t for t in tooltip]
+
+
+
+def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]] | tuple[list, np.ndarray] = None,
     chart: alt.Chart = None, layer: alt.Chart = None, subset: list = None,
     width = 1, dash_and_gap_lengths: tuple[float, float] | str = None, colour = 'grey', cmap: str = None, alpha = 1.,
     tooltip: list[str] = None, legend = False,
-    loop_radius = .05, loop_angle = 90., loop_n_points = 30,
+    loop_radius = .05, loop_angle = 90., loop_n_points = 30, show_self_loops = True,
     curved_edges = False, control_points: list[tuple[float, float]] = None, interpolation = 'basis',
-    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None):
+    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None, data_url: str = None):
     '''Draw the edges of graph G using Altair, with control over various features, including filtering and curve.
 
     Note that for arguments which accept edge attributes as alternatives to fixed values there are additional options generated in the drawing process:
@@ -20,8 +98,9 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param G: The graph to draw.
     :param pos: The node positions of G, as produced by any of the `nx.*_layout functions`, e.g. `nx.kamada_kawai_layout`,
-        which is the default if pos is None (called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
+        which is the default if pos is None for graphs of up to 500 nodes (see `default_layout` for larger ones; called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
         Note that most layouts use random seeds; for reproducible results set `np.random.seed(...)` before they are called.
+        Alternatively, a pair of a node list and an (n_nodes, 2) array of their coordinates (in the same order), which avoids building a dict from existing arrays.
 
     :param chart: A pre-existing chart to draw over.
     :param layer: A pre-existing chart layer to draw in.
@@ -52,6 +131,7 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
         (in the straight-edge case, respectively: a short segment, a triangle, and a square).
         NOTE: to draw straight edges but interpolation-curved loops (rather than by high manual point count), set control_points to [] rather than None
         (or really any list of points whose 2nd coordinate is 0).
+    :param show_self_loops: Whether to draw edges starting and ending on the same node (only applies when drawing from G rather than from chart or layer).
 
     :param curved_edges: Whether edges should be curved (using control_points and interpolate arguments).
     :param control_points: The intermediate points to place along edges, which, depending on curved_edges, are either used for interpolation or are connected with straight lines; they should be expressed as a tuple of coordinates relative to their straight edge:
@@ -69,6 +149,8 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param mark_kwargs: Custom fields to inject into the `.mark_line` call without restrictions or safeguards; will overwrite existing fields on overlaps.
     :param encode_kwargs: Custom fields to inject into the `.encode` call without restrictions or safeguards; will overwrite existing fields on overlaps.
+    :param data_url: If not None, the path (relative to where the chart will be displayed) of a JSON file to write the drawn edge rows to, with the chart referencing it instead of embedding them;
+        this keeps the chart spec small for large graphs, but the returned chart's data is then not a dataframe, hence it cannot be used as an input chart or layer to these functions.
 
     :return: An Altair chart of the edges of given graph.
     '''
@@ -81,11 +163,13 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
         df_edges = chart.layer[0].data
         edge_chart = chart.layer[0]
     elif G is not None:
-        if pos is None: pos = nx.drawing.layout.kamada_kawai_layout(G)
-        df_edges = to_pandas_edges(G, pos, control_points = control_points, loop_radius = loop_radius, loop_angle = loop_angle, loop_n_points = loop_n_points)
+        pos = default_layout(G) if pos is None else _as_positions(pos)
+        df_edges = to_pandas_edges(G, pos, control_points = control_points, loop_radius = loop_radius, loop_angle = loop_angle, loop_n_points = loop_n_points,
+            include_self_loops = show_self_loops)
         edge_chart = alt.Chart(df_edges)
     else: raise ValueError('one of G, chart or layer is required to draw.')
 
+    cols = frozenset(df_edges.columns) # plain hash lookups rather than Index.__contains__ for the repeated attribute checks below
     marker_attrs, encoded_attrs = {}, {}
     legend = {} if legend else None
 
@@ -94,7 +178,7 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     # Restrict to a given subset
     if isinstance(subset, list):
-        df_edges = edge_chart.data = df_edges.loc[df_edges['pair'].isin(subset)]
+        df_edges = edge_chart.data = _select_pairs(df_edges, subset)
     elif subset is not None: raise TypeError('subset must be a list or None.')
 
     # Width
@@ -106,22 +190,22 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
     if dash_and_gap_lengths is not None: # allow no dashes
         if not (isinstance(dash_and_gap_lengths, str) or (isinstance(dash_and_gap_lengths, tuple) and len(dash_and_gap_lengths) == 2 and isinstance(dash_and_gap_lengths[0], (float, int)) and isinstance(dash_and_gap_lengths[1], (float, int)))):
             raise TypeError('dash_and_gap_lengths must be None or a pair of numbers representing the lengths of dashes and gaps between dashes or an edge attribute containing the same or containing strings.')
-        if dash_and_gap_lengths in df_edges.columns: encoded_attrs['strokeDash'] = alt.StrokeDash(dash_and_gap_lengths, legend = legend)
+        if dash_and_gap_lengths in cols: encoded_attrs['strokeDash'] = alt.StrokeDash(dash_and_gap_lengths, legend = legend)
         elif isinstance(dash_and_gap_lengths, str): raise ValueError(f'dash_and_gap_lengths was set to a string (\'{dash_and_gap_lengths}\') not matching any edge attribute; its allowed values are None or a pair of numbers representing the lengths of dashes and gaps between dashes or an edge attribute containing the same or containing strings.')
         else: marker_attrs['strokeDash'] = dash_and_gap_lengths
 
     # Colour
     if not isinstance(colour, str): raise TypeError('colour must be a string (either a colour or an edge attribute containing colour strings or floats for a colour map).')
-    elif colour in df_edges.columns:
+    elif colour in cols:
         if cmap is None: encoded_attrs['color'] = alt.Color(colour, legend = legend)
         elif isinstance(cmap, str):
-            if df_edges.dtypes[colour] == 'O': raise TypeError(f'the edge attribute ({colour}) to use with cmap {cmap} is non-numeric.')
-            else: encoded_attrs['color'] = alt.Color(colour, scale = alt.Scale(scheme = cmap), legend = legend)
+            if df_edges[colour].dtype.kind == 'O': raise TypeError(f'the edge attribute ({colour}) to use with cmap {cmap} is non-numeric.')
+            else: encoded_attrs['color'] = alt.Color(colour, scale = _schema_object(alt.Scale, scheme = cmap), legend = legend)
         else: raise TypeError('cmap must be a string (colourmap name) or None.')
     else: marker_attrs['color'] = colour
 
     # Opacity
-    if isinstance(alpha, str): encoded_attrs['opacity'] = alpha
+    if isinstance(alpha, str): encoded_attrs['opacity'] = alt.Opacity(alpha)
     elif isinstance(alpha, (int, float)): marker_attrs['opacity'] = alpha
     elif alpha is not None: raise TypeError('alpha must be a string or None.')
 
@@ -131,19 +215,20 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
         else: raise TypeError('interpolate must be a string.')
     
     # Tooltip
-    if tooltip is not None: encoded_attrs['tooltip'] = tooltip
+    if tooltip is not None: encoded_attrs['tooltip'] = _tooltip_channels(tooltip)
 
 
     # ---------- Finalise the fields and construct the visualisation ------------
 
-    marker_attrs['point'] = alt.OverlayMarkDef(opacity = 0, size = 400) # to make triggering tooltips easier
-    encoded_attrs = dict(x = alt.X('x').axis(None), y = alt.Y('y').axis(None), detail = 'edge', order = 'order', **encoded_attrs)
+    marker_attrs['point'] = _schema_object(alt.OverlayMarkDef, opacity = 0, size = 400) # to make triggering tooltips easier
+    encoded_attrs = dict(x = alt.X('x', axis = None), y = alt.Y('y', axis = None), detail = alt.Detail('edge'), order = alt.Order('order'), **encoded_attrs)
 
     # Inject custom fields without restrictions or safeguards
     if mark_kwargs is not None: marker_attrs = dict(marker_attrs, **mark_kwargs)
     if encode_kwargs is not None: encoded_attrs = dict(encoded_attrs, **encode_kwargs)
 
-    edge_chart = edge_chart.mark_line(**marker_attrs).encode(**encoded_attrs)
+    edge_chart = _mark_and_encode(edge_chart, 'line', marker_attrs, encoded_attrs)
+    if data_url is not None: _reference_data(edge_chart, _url_data(df_edges, data_url))
 
     if chart is not None: chart.layer[0] = edge_chart
 
@@ -151,13 +236,13 @@ def draw_networkx_edges(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
 
 
-def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None,
+def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]] | tuple[list, np.ndarray] = None,
     chart: alt.Chart = None, layer: alt.Chart = None, subset: list = None,
     width = 1, dash_and_gap_lengths: tuple[float, float] | str = None, length = .1, length_is_relative = True,
     colour = 'grey', cmap: str = None, alpha = 1.,
     tooltip: list[str] = None, legend = False,
-    curved_edges = False, control_points: list[tuple[float, float]] = None,
-    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None):
+    curved_edges = False, control_points: list[tuple[float, float]] = None, show_self_loops = True,
+    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None, data_url: str = None):
     '''Draw the edges of graph G using Altair, with control over various features, including filtering and curve.
     
     Note that for arguments which accept edge attributes as alternatives to fixed values there are additional options generated in the drawing process:
@@ -165,8 +250,9 @@ def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param G: The graph to draw.
     :param pos: The node positions of G, as produced by any of the `nx.*_layout functions`, e.g. `nx.kamada_kawai_layout`,
-        which is the default if pos is None (called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
+        which is the default if pos is None for graphs of up to 500 nodes (see `default_layout` for larger ones; called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
         Note that most layouts use random seeds; for reproducible results set `np.random.seed(...)` before they are called.
+        Alternatively, a pair of a node list and an (n_nodes, 2) array of their coordinates (in the same order), which avoids building a dict from existing arrays.
 
     :param chart: A pre-existing chart to draw over.
     :param layer: A pre-existing chart layer to draw in.
@@ -188,9 +274,13 @@ def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param curved_edges: Whether the edges for which arrows are to be drawn are curved.
     :param control_points: The intermediate points placed along edges, based on which (along with curved_edges) arrows are to be drawn.
+    :param show_self_loops: Whether self-loops are drawn in the corresponding edge layer (see draw_networkx_edges), so that the arrows' 'edge' numbering matches it
+        (arrows themselves are never drawn for self-loops; only applies when drawing from G rather than from chart or layer).
 
     :param mark_kwargs: Custom fields to inject into the `.mark_line` call without restrictions or safeguards; will overwrite existing fields on overlaps.
     :param encode_kwargs: Custom fields to inject into the `.encode` call without restrictions or safeguards; will overwrite existing fields on overlaps.
+    :param data_url: If not None, the path (relative to where the chart will be displayed) of a JSON file to write the drawn edge rows to, with the chart referencing it instead of embedding them;
+        this keeps the chart spec small for large graphs, but the returned chart's data is then not a dataframe, hence it cannot be used as an input chart or layer to these functions.
 
     :return: An Altair chart of the edges of given graph.
     '''
@@ -203,11 +293,13 @@ def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
         df_edge_arrows = chart.layer[0].data
         edge_chart = chart.layer[0]
     elif G is not None:
-        if pos is None: pos = nx.drawing.layout.kamada_kawai_layout(G)
-        df_edge_arrows = to_pandas_edge_arrows(G, pos, length = length, length_is_relative = length_is_relative, control_points = control_points)
+        pos = default_layout(G) if pos is None else _as_positions(pos)
+        df_edge_arrows = to_pandas_edge_arrows(G, pos, length = length, length_is_relative = length_is_relative, control_points = control_points,
+            include_self_loops = show_self_loops)
         edge_chart = alt.Chart(df_edge_arrows)
     else: raise ValueError('one of G, chart or layer is required to draw.')
 
+    cols = frozenset(df_edge_arrows.columns)
     marker_attrs, encoded_attrs = {}, {}
     legend = {} if legend else None
 
@@ -216,7 +308,7 @@ def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     # Restrict to a given subset
     if isinstance(subset, list):
-        df_edge_arrows = edge_chart.data = df_edge_arrows.loc[df_edge_arrows['pair'].isin(subset)]
+        df_edge_arrows = edge_chart.data = _select_pairs(df_edge_arrows, subset)
     elif subset is not None: raise TypeError('subset must be a list or None.')
 
     # Width
@@ -228,39 +320,40 @@ def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
     if dash_and_gap_lengths is not None: # allow no dashes
         if not (isinstance(dash_and_gap_lengths, str) or (isinstance(dash_and_gap_lengths, tuple) and len(dash_and_gap_lengths) == 2 and isinstance(dash_and_gap_lengths[0], (float, int)) and isinstance(dash_and_gap_lengths[1], (float, int)))):
             raise TypeError('dash_and_gap_lengths must be None or a pair of numbers representing the lengths of dashes and gaps between dashes or an edge attribute containing the same or containing strings.')
-        if dash_and_gap_lengths in df_edge_arrows.columns: encoded_attrs['strokeDash'] = alt.StrokeDash(dash_and_gap_lengths, legend = legend)
+        if dash_and_gap_lengths in cols: encoded_attrs['strokeDash'] = alt.StrokeDash(dash_and_gap_lengths, legend = legend)
         elif isinstance(dash_and_gap_lengths, str): raise ValueError(f'dash_and_gap_lengths was set to a string (\'{dash_and_gap_lengths}\') not matching any edge attribute; its allowed values are None or a pair of numbers representing the lengths of dashes and gaps between dashes or an edge attribute containing the same or containing strings.')
         else: marker_attrs['strokeDash'] = dash_and_gap_lengths
 
     # Colour
     if not isinstance(colour, str): raise TypeError('colour must be a string (either a colour or an edge attribute containing colour strings or floats for a colour map).')
-    elif colour in df_edge_arrows.columns:
+    elif colour in cols:
         if cmap is None: encoded_attrs['color'] = alt.Color(colour, legend = legend)
         elif isinstance(cmap, str):
-            if df_edge_arrows.dtypes[colour] == 'O': raise TypeError(f'the edge attribute ({colour}) to use with cmap {cmap} is non-numeric.')
-            else: encoded_attrs['color'] = alt.Color(colour, scale = alt.Scale(scheme = cmap), legend = legend)
+            if df_edge_arrows[colour].dtype.kind == 'O': raise TypeError(f'the edge attribute ({colour}) to use with cmap {cmap} is non-numeric.')
+            else: encoded_attrs['color'] = alt.Color(colour, scale = _schema_object(alt.Scale, scheme = cmap), legend = legend)
         else: raise TypeError('cmap must be a string (colourmap name) or None.')
     else: marker_attrs['color'] = colour
 
     # Opacity
-    if isinstance(alpha, str): encoded_attrs['opacity'] = alpha
+    if isinstance(alpha, str): encoded_attrs['opacity'] = alt.Opacity(alpha)
     elif isinstance(alpha, (int, float)): marker_attrs['opacity'] = alpha
     elif alpha is not None: raise TypeError('alpha must be a string or None.')
 
     # Tooltip
-    if tooltip is not None: encoded_attrs['tooltip'] = tooltip
+    if tooltip is not None: encoded_attrs['tooltip'] = _tooltip_channels(tooltip)
 
 
     # ---------- Finalise the fields and construct the visualisation ------------
 
-    marker_attrs['point'] = alt.OverlayMarkDef(opacity = 0, size = 100) # to make triggering tooltips easier; smaller than edges' hover points to avoid overcrowding near nodes
-    encoded_attrs = dict(x = alt.X('x').axis(None), y = alt.Y('y').axis(None), detail = 'edge', **encoded_attrs)
+    marker_attrs['point'] = _schema_object(alt.OverlayMarkDef, opacity = 0, size = 100) # to make triggering tooltips easier; smaller than edges' hover points to avoid overcrowding near nodes
+    encoded_attrs = dict(x = alt.X('x', axis = None), y = alt.Y('y', axis = None), detail = alt.Detail('edge'), **encoded_attrs)
 
     # Inject custom fields without restrictions or safeguards
     if mark_kwargs is not None: marker_attrs = dict(marker_attrs, **mark_kwargs)
     if encode_kwargs is not None: encoded_attrs = dict(encoded_attrs, **encode_kwargs)
 
-    edge_chart = edge_chart.mark_line(**marker_attrs).encode(**encoded_attrs)
+    edge_chart = _mark_and_encode(edge_chart, 'line', marker_attrs, encoded_attrs)
+    if data_url is not None: _reference_data(edge_chart, _url_data(df_edge_arrows, data_url))
 
     if chart is not None: chart.layer[0] = edge_chart
 
@@ -268,13 +361,13 @@ def draw_networkx_arrows(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
 
 
-def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None,
+def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]] | tuple[list, np.ndarray] = None,
     chart: alt.Chart = None, layer: alt.Chart = None, subset: list = None,
     size: int | str = 400, shape = 'circle',
     colour = 'teal', cmap: str = None, alpha = 1.,
     outline_width: float | str = 1., outline_dash_and_gap_lengths: tuple[float, float] | str = None, outline_colour: str = None,
     tooltip: list[str] = None, legend = False,
-    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None):
+    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None, data_url: str = None):
     '''Draw the nodes of graph G using Altair, with control over various features, including filtering, and sizes.
     
     Note that for arguments which accept node attributes as alternatives to fixed values there are additional options generated in the drawing process:
@@ -282,8 +375,9 @@ def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param G: The graph to draw.
     :param pos: The node positions of G, as produced by any of the `nx.*_layout functions`, e.g. `nx.kamada_kawai_layout`,
-        which is the default if pos is None (called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
+        which is the default if pos is None for graphs of up to 500 nodes (see `default_layout` for larger ones; called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
         Note that most layouts use random seeds; for reproducible results set `np.random.seed(...)` before they are called.
+        Alternatively, a pair of a node list and an (n_nodes, 2) array of their coordinates (in the same order), which avoids building a dict from existing arrays.
 
     :param chart: A pre-existing chart to draw over.
     :param layer: A pre-existing chart layer to draw in.
@@ -308,6 +402,8 @@ def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param mark_kwargs: Custom fields to inject into the `.mark_point` call without restrictions or safeguards; will overwrite existing fields on overlaps.
     :param encode_kwargs: Custom fields to inject into the `.encode` call without restrictions or safeguards; will overwrite existing fields on overlaps.
+    :param data_url: If not None, the path (relative to where the chart will be displayed) of a JSON file to write the drawn node rows to, with the chart referencing it instead of embedding them;
+        this keeps the chart spec small for large graphs, but the returned chart's data is then not a dataframe, hence it cannot be used as an input chart or layer to these functions.
 
     :return: An Altair chart of the nodes of the given graph.
     '''
@@ -318,11 +414,12 @@ def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
         df_nodes = chart.layer[1].data
         node_chart = chart.layer[1]
     elif G is not None:
-        if pos is None: pos = nx.drawing.layout.kamada_kawai_layout(G)
+        pos = default_layout(G) if pos is None else _as_positions(pos)
         df_nodes = to_pandas_nodes(G, pos)
         node_chart = alt.Chart(df_nodes)
     else: raise ValueError('one of G, chart or layer is required to draw.')
 
+    cols = frozenset(df_nodes.columns)
     marker_attrs, encoded_attrs = {}, {}
     legend = {} if legend else None
 
@@ -331,7 +428,7 @@ def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     # Restrict to a given subset
     if isinstance(subset, list):
-        df_nodes = node_chart.data = df_nodes.loc[subset]
+        df_nodes = node_chart.data = _select_nodes(df_nodes, subset)
     elif subset is not None: raise TypeError('node_subset must be a list or None.')
 
     # Size
@@ -341,13 +438,13 @@ def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     # Shape
     if not isinstance(shape, str): raise TypeError('shape must be a string (either an altair point-mark shape or an edge attribute containing the same).')
-    elif shape in df_nodes.columns: encoded_attrs['shape'] = alt.Shape(shape, legend = legend)
+    elif shape in cols: encoded_attrs['shape'] = alt.Shape(shape, legend = legend)
     else: marker_attrs['shape'] = shape
 
     # Fill colour
     if colour is not None: # allow nodes to be outlines with no fill
         if not isinstance(colour, str): raise TypeError('colour must be a string or None for no fill.')
-        if colour in df_nodes.columns: encoded_attrs['fill'] = colour
+        if colour in cols: encoded_attrs['fill'] = alt.Fill(colour)
         else: marker_attrs['fill'] = colour
 
     # Outline width
@@ -359,39 +456,40 @@ def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
     if outline_dash_and_gap_lengths is not None: # allow no dashes
         if not (isinstance(outline_dash_and_gap_lengths, str) or (isinstance(outline_dash_and_gap_lengths, tuple) and len(outline_dash_and_gap_lengths) == 2 and isinstance(outline_dash_and_gap_lengths[0], (float, int)) and isinstance(outline_dash_and_gap_lengths[1], (float, int)))):
             raise TypeError('outline_dash_and_gap_lengths must be None or a pair of numbers representing the lengths of dashes and gaps between dashes or a node attribute containing the same or containing strings.')
-        if outline_dash_and_gap_lengths in df_nodes.columns: encoded_attrs['strokeDash'] = alt.StrokeDash(outline_dash_and_gap_lengths, legend = legend)
+        if outline_dash_and_gap_lengths in cols: encoded_attrs['strokeDash'] = alt.StrokeDash(outline_dash_and_gap_lengths, legend = legend)
         elif isinstance(outline_dash_and_gap_lengths, str): raise ValueError(f'outline_dash_and_gap_lengths was set to a string (\'{outline_dash_and_gap_lengths}\') not matching any edge attribute; its allowed values are None or a pair of numbers representing the lengths of dashes and gaps between dashes or a node attribute containing the same or containing strings.')
         else: marker_attrs['strokeDash'] = outline_dash_and_gap_lengths
 
     # Outline colour
     if outline_colour is not None: # match fill colour
         if not isinstance(outline_colour, str): raise TypeError('outline_colour must be a string or None to match fill colour.')
-        if outline_colour in df_nodes.columns: encoded_attrs['color'] = outline_colour
+        if outline_colour in cols: encoded_attrs['color'] = alt.Color(outline_colour)
         else: marker_attrs['color'] = outline_colour
 
     # Opacity
-    if isinstance(alpha, str): encoded_attrs['opacity'] = alpha
+    if isinstance(alpha, str): encoded_attrs['opacity'] = alt.Opacity(alpha)
     elif isinstance(alpha, (int, float)): marker_attrs['opacity'] = alpha
     elif alpha is not None: raise TypeError('alpha must be a string or None.')
 
     # Colour map
     if isinstance(cmap, str):
-        encoded_attrs['fill'] = alt.Color(colour, scale = alt.Scale(scheme = cmap))
+        encoded_attrs['fill'] = alt.Color(colour, scale = _schema_object(alt.Scale, scheme = cmap))
     elif cmap is not None: raise TypeError('cmap must be a string (colourmap name) or None.')
 
     # Tooltip
-    if tooltip is not None: encoded_attrs['tooltip'] = tooltip
+    if tooltip is not None: encoded_attrs['tooltip'] = _tooltip_channels(tooltip)
 
 
     # ---------- Finalise the fields and construct the visualisation ------------
 
-    encoded_attrs = dict(x = alt.X('x').axis(None), y = alt.Y('y').axis(None), **encoded_attrs)
+    encoded_attrs = dict(x = alt.X('x', axis = None), y = alt.Y('y', axis = None), **encoded_attrs)
 
     # Inject custom fields without restrictions or safeguards
     if mark_kwargs is not None: marker_attrs = dict(marker_attrs, **mark_kwargs)
     if encode_kwargs is not None: encoded_attrs = dict(encoded_attrs, **encode_kwargs)
 
-    node_chart = node_chart.mark_point(**marker_attrs).encode(**encoded_attrs)
+    node_chart = _mark_and_encode(node_chart, 'point', marker_attrs, encoded_attrs)
+    if data_url is not None: _reference_data(node_chart, _url_data(df_nodes, data_url))
 
     if chart is not None: chart.layer[1] = node_chart
 
@@ -399,10 +497,10 @@ def draw_networkx_nodes(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
 
 
-def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None,
+def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]] | tuple[list, np.ndarray] = None,
     chart: alt.Chart = None, layer: alt.Chart = None, subset: list = None,
     label: str = None, font_size = 15, font_colour = 'black',
-    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None):
+    mark_kwargs: dict[str, ...] = None, encode_kwargs: dict[str, ...] = None, data_url: str = None):
     '''Draw the node labels of graph G using Altair, with control over various features, including node filtering, and font.
     
     Note that for arguments which accept node attributes as alternatives to fixed values there are additional options generated in the drawing process:
@@ -410,8 +508,9 @@ def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param G: The graph to draw.
     :param pos: The node positions of G, as produced by any of the `nx.*_layout functions`, e.g. `nx.kamada_kawai_layout`,
-        which is the default if pos is None (called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
+        which is the default if pos is None for graphs of up to 500 nodes (see `default_layout` for larger ones; called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
         Note that most layouts use random seeds; for reproducible results set `np.random.seed(...)` before they are called.
+        Alternatively, a pair of a node list and an (n_nodes, 2) array of their coordinates (in the same order), which avoids building a dict from existing arrays.
 
     :param chart: A pre-existing chart to draw over.
     :param layer: A pre-existing chart layer to draw in.
@@ -424,6 +523,8 @@ def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     :param mark_kwargs: Custom fields to inject into the `.mark_text` call without restrictions or safeguards; will overwrite existing fields on overlaps.
     :param encode_kwargs: Custom fields to inject into the `.encode` call without restrictions or safeguards; will overwrite existing fields on overlaps.
+    :param data_url: If not None, the path (relative to where the chart will be displayed) of a JSON file to write the drawn node rows to, with the chart referencing it instead of embedding them;
+        this keeps the chart spec small for large graphs, but the returned chart's data is then not a dataframe, hence it cannot be used as an input chart or layer to these functions.
 
     :return: An Altair chart of the node labels of the given graph.
     '''
@@ -434,11 +535,12 @@ def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
         df_nodes = chart.layer[1].data
         node_chart = chart.layer[1]
     elif G is not None:
-        if pos is None: pos = nx.drawing.layout.kamada_kawai_layout(G)
+        pos = default_layout(G) if pos is None else _as_positions(pos)
         df_nodes = to_pandas_nodes(G, pos)
         node_chart = alt.Chart(df_nodes)
     else: raise ValueError('one of G, chart or layer is required to draw.')
 
+    cols = frozenset(df_nodes.columns)
     marker_attrs, encoded_attrs = {}, {}
 
 
@@ -446,12 +548,12 @@ def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     # Restrict to a given subset
     if isinstance(subset, list):
-        df_nodes = node_chart.data = df_nodes.loc[subset]
+        df_nodes = node_chart.data = _select_nodes(df_nodes, subset)
     elif subset is not None: raise TypeError('node_subset must be a list or None.')
 
     # Text
     if not isinstance(label, str): raise TypeError('label must be a string.')
-    if label in df_nodes.columns: encoded_attrs['text'] = label
+    if label in cols: encoded_attrs['text'] = alt.Text(label)
     else: marker_attrs['text'] = label
 
     # Size
@@ -461,20 +563,21 @@ def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
     # Colour
     if not isinstance(font_colour, str): raise TypeError('font_color must be a string.')
-    if font_colour in df_nodes.columns: encoded_attrs['fill'] = font_colour
+    if font_colour in cols: encoded_attrs['fill'] = alt.Fill(font_colour)
     else: marker_attrs['fill'] = font_colour
 
 
     # ---------- Finalise the fields and construct the visualisation ------------
 
     marker_attrs = dict(baseline = 'middle', **marker_attrs)
-    encoded_attrs = dict(x = alt.X('x').axis(None), y = alt.Y('y').axis(None), **encoded_attrs)
+    encoded_attrs = dict(x = alt.X('x', axis = None), y = alt.Y('y', axis = None), **encoded_attrs)
 
     # Inject custom fields without restrictions or safeguards
     if mark_kwargs is not None: marker_attrs = dict(marker_attrs, **mark_kwargs)
     if encode_kwargs is not None: encoded_attrs = dict(encoded_attrs, **encode_kwargs)
 
-    node_chart = node_chart.mark_text(**marker_attrs).encode(**encoded_attrs)
+    node_chart = _mark_and_encode(node_chart, 'text', marker_attrs, encoded_attrs)
+    if data_url is not None: _reference_data(node_chart, _url_data(df_nodes, data_url))
 
     if chart is not None: chart.layer[1] = node_chart
 
@@ -482,7 +585,7 @@ def draw_networkx_labels(G: nx.Graph = None, pos: dict[..., tuple[float, float]]
 
 
 
-def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None, chart: alt.Chart = None,
+def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] | tuple[list, np.ndarray] = None, chart: alt.Chart = None,
     node_subset: list = None, edge_subset: list = None, show_orphans = True, show_self_loops = True,
     node_size: int | str = 400, node_shape = 'circle', node_colour = 'teal', node_cmap: str = None, node_alpha = 1.,
     node_outline_width: float | str = 1., node_outline_dash_and_gap_lengths: tuple[float, float] | str = None, node_outline_colour: str = None,
@@ -496,7 +599,7 @@ def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None
     edge_mark_kwargs: dict[str, ...] = None, edge_encode_kwargs: dict[str, ...] = None,
     arrow_width = 2, arrow_length = .1, arrow_length_is_relative = True, arrow_colour = 'black', arrow_cmap: str = None, arrow_alpha = 1., arrow_legend = False,
     arrow_mark_kwargs: dict[str, ...] = None, arrow_encode_kwargs: dict[str, ...] = None,
-    chart_width: float | None = 500., chart_height: float | None = 300., chart_padding = .05):
+    chart_width: float | None = 500., chart_height: float | None = 300., chart_padding = .05, data_url_prefix: str = None, layout_algorithm = 'auto', layout_cache = True, layout_cache_dir: str = None, rescale_pos = True):
     '''Draw the graph G using Altair, with control over node, edge and arrow features, including filtering and curved edges.
     
     Note that for arguments which accept node or edge attributes as alternatives to fixed values there are additional options generated in the drawing process:
@@ -521,8 +624,9 @@ def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None
 
     :param G: The graph to draw.
     :param pos: The node positions of G, as produced by any of the `nx.*_layout functions`, e.g. `nx.kamada_kawai_layout`,
-        which is the default if pos is None (called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
+        which is the default if pos is None for graphs of up to 500 nodes (see `default_layout` for larger ones; called with no edge attribute to use as weights, hence possibly missing out on more meaningful non-default positions).
         Note that most layouts use random seeds; for reproducible results set `np.random.seed(...)` before they are called.
+        Alternatively, a pair of a node list and an (n_nodes, 2) array of their coordinates (in the same order), which avoids building a dict from existing arrays.
     :param chart: A pre-existing chart to draw over.
 
     :param node_subset: Subset of nodes to draw.
@@ -618,67 +722,90 @@ def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None
         either size is allowed to be None (though not both), letting the graph's own aspect ratio determine the other;
         if both are not None, then the graph's aspect ratio is reshaped to the given one.
     :param chart_padding: Proportion of the larger of the two axes to use as padding between graph and chart borders (followed by a slight padding increase due to final aspect ratio adjustments).
+    :param data_url_prefix: If not None, each distinct layer dataframe is written to a JSON file named by this prefix and a counter (e.g. 'graph-0.json', 'graph-1.json'),
+        with the layers referencing these files (relative to where the chart will be displayed) instead of embedding their rows; see the data_url argument of the individual layer functions.
+    :param layout_algorithm: The algorithm to compute the default layout with (if pos is None): 'auto' for the size-dependent choice described in `default_layout`,
+        or one of 'kamada_kawai' (only allowed for up to 2000 nodes), 'spring', 'spectral' and 'random'.
+    :param layout_cache: Whether the default layout (used if pos is None) may be reused from (and stored for) previous drawings of graphs with the same nodes, edges and edge weights;
+        if False it is always recomputed.
+    :param layout_cache_dir: If not None, a directory in which default layouts are also stored (as pickle files), so that they are reused across sessions; see `default_layout`.
+    :param rescale_pos: Whether to rescale the node coordinates as described below (see the return value); if False they are drawn as given (e.g. if they are already scaled),
+        in which case loop_radius and arrow lengths (if not relative) are in their units, and the coordinate ranges are only computed if one of chart_width and chart_height is None.
 
     :return: An Altair chart of the given graph; its possible layers (`.layer`) are [edges, arrows, nodes, labels], in this order,
         but arrows are present only if G is directed and labels only if node_label is not None.
-        Note: the node coordinates will be different from those in the input pos, as scaling takes place to ensure that graph and chart aspect ratios match
+        Note: unless rescale_pos is False, the node coordinates will be different from those in the input pos, as scaling takes place to ensure that graph and chart aspect ratios match
         (so that the x and y axes' units are equal);
         in particular, the shorter axis will have length of approximately 1 + 2 * chart_padding
         (this is to ensure that the size of self-loops for a given loop_radius value is consistent relative to chart size).
-        The new coordinates can be extracted from the dataframe of the node layer: `output.layer[index_of_node_layer].data`.
+        The new coordinates can be extracted from the dataframe of the node layer: `output.layer[index_of_node_layer].data` (unless data_url_prefix is set).
         The chart size and axes' domains can be copied to a new chart with the `copy_size_and_axes` function (exported by default),
         or can be extracted manually with, e.g. `output_chart.width` and `output_chart.encoding.x['scale']['domain']`.
     '''
-    if not (show_self_loops and show_orphans):
-        G = deepcopy(G)
-        if not show_self_loops: G.remove_edges_from(nx.selfloop_edges(G))
-        if not show_orphans: G.remove_nodes_from(list(nx.isolates(G))) # wants a non-generator iterable
+    if not show_orphans: # orphans are excluded from the graph itself (through a subgraph view, i.e. without copying it) since they affect its layout and scaling, while self-loops are simply skipped when building the edge dataframe
+        self_loops = Counter(u for u, _ in nx.selfloop_edges(G)) if not show_self_loops else Counter() # nodes with only self-loops are orphans too then
+        keep = {n for n, d in G.degree if d > 2 * self_loops[n]} # each self-loop counts twice towards the degree
+        G = nx.subgraph_view(G, filter_node = keep.__contains__) # a predicate rather than G.subgraph(keep), whose views iterate small node sets in set (i.e. hash) order
     
-    if not pos: pos = nx.drawing.layout.kamada_kawai_layout(G)
+    if not pos: pos = default_layout(G, algorithm = layout_algorithm, cache = layout_cache, cache_dir = layout_cache_dir)
 
 
     # ---------- Scale the coordinates ------------
 
     if chart_width is None and chart_height is None: raise ValueError('chart_width and chart_height cannot both be None; if one is None then the other is determined by the graph\'s own aspect ratio.')
 
-    pos_xs, pos_ys = zip(*pos.values())
-    x_range, y_range = max(pos_xs) - min(pos_xs), max(pos_ys) - min(pos_ys)
-    if chart_width is None: chart_width = chart_height * x_range / y_range
-    if chart_height is None: chart_height = chart_width * y_range / x_range
-
-    # Scale x and y to [0,1] (so that loop_radius values are consistent across charts)
-    pos = {n: (0. if x_range == 0 else (xy[0] - min(pos_xs)) / x_range, 0. if y_range == 0 else (xy[1] - min(pos_ys)) / y_range) for n, xy in pos.items()}
-    if chart_width != chart_height: # Stretch the coordinate corresponding to the larger chart size so that aspect ratios match (and therefore x and y axes' units are equal)
-        pos = {n: (xy[0] * chart_width/chart_height, xy[1]) if chart_width >= chart_height else (xy[0], xy[1] * chart_height/chart_width) for n, xy in pos.items()}
+    pos = _as_positions(pos)
+    if rescale_pos or chart_width is None or chart_height is None: # the coordinate ranges are not needed otherwise
+        if isinstance(pos, _PosView): nodes, xy = list(pos), pos.xy
+        else:
+            nodes = list(pos)
+            xy = np.fromiter(chain.from_iterable(pos[n] for n in nodes), dtype = float, count = 2 * len(nodes)).reshape(-1, 2)
+        mins = xy.min(axis = 0)
+        x_range, y_range = (xy.max(axis = 0) - mins).tolist()
+        if chart_width is None: chart_width = chart_height * x_range / y_range
+        if chart_height is None: chart_height = chart_width * y_range / x_range
+
+        if rescale_pos:
+            # Scale x and y to [0,1] (so that loop_radius values are consistent across charts); a constant coordinate is set to 0
+            #   Only the shift allocates a new array (xy may be the caller's own one); the division is in place
+            xy = xy - mins
+            xy /= [x_range or 1., y_range or 1.]
+            # Stretch the coordinate corresponding to the larger chart size so that aspect ratios match (and therefore x and y axes' units are equal)
+            if chart_width > chart_height: xy[:, 0] = xy[:, 0] * chart_width / chart_height
+            elif chart_width < chart_height: xy[:, 1] = xy[:, 1] * chart_height / chart_width
+        pos = _PosView(nodes, xy) # lets the layers gather node positions by array indexing rather than one lookup and conversion per node or edge endpoint
 
 
     # ---------- Construct the layers ------------
 
     layers = []
+    n_drawn_edges = G.number_of_edges() - (0 if show_self_loops else nx.number_of_selfloops(G))
+    directed = G.is_directed()
 
     # Edges
-    if len(G.edges):
+    if n_drawn_edges:
         edges = draw_networkx_edges(G, pos, chart = chart, subset = edge_subset,
             width = edge_width, dash_and_gap_lengths = edge_dash_and_gap_lengths, colour = edge_colour, cmap = edge_cmap, alpha = edge_alpha,
             tooltip = edge_tooltip, legend = edge_legend,
-            loop_radius = loop_radius, loop_angle = loop_angle, loop_n_points = loop_n_points,
+            loop_radius = loop_radius, loop_angle = loop_angle, loop_n_points = loop_n_points, show_self_loops = show_self_loops,
             curved_edges = curved_edges, control_points = edge_control_points, interpolation = edge_interpolation,
             mark_kwargs = edge_mark_kwargs, encode_kwargs = edge_encode_kwargs)
         layers.append(edges)
 
         # Arrows
-        if nx.is_directed(G):
+        if directed:
             arrows = draw_networkx_arrows(G, pos, chart = chart, subset = edge_subset,
                 width = arrow_width, dash_and_gap_lengths = edge_dash_and_gap_lengths, length = arrow_length, length_is_relative = arrow_length_is_relative,
                 colour = arrow_colour, cmap = arrow_cmap, alpha = arrow_alpha,
                 tooltip = edge_tooltip, legend = arrow_legend,
-                curved_edges = curved_edges, control_points = edge_control_points,
+                curved_edges = curved_edges, control_points = edge_control_points, show_self_loops = show_self_loops,
                 mark_kwargs = arrow_mark_kwargs, encode_kwargs = arrow_encode_kwargs)
             layers.append(arrows)
 
     # Nodes
-    if len(G.nodes):
-        nodes = draw_networkx_nodes(G, pos, chart = chart, subset = node_subset,
+    if G.number_of_nodes():
+        df_nodes = to_pandas_nodes(G, pos) if chart is None else None # build the node dataframe once for both the node and label layers
+        nodes = draw_networkx_nodes(G, pos, chart = chart, layer = None if df_nodes is None else alt.Chart(df_nodes), subset = node_subset,
             size = node_size, shape = node_shape,
             colour = node_colour, cmap = node_cmap, alpha = node_alpha,
             outline_width = node_outline_width, outline_dash_and_gap_lengths = node_outline_dash_and_gap_lengths, outline_colour = node_outline_colour,
@@ -688,7 +815,7 @@ def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None
 
         # Node labels
         if node_label:
-            labels = draw_networkx_labels(G, pos, chart = chart, subset = node_subset,
+            labels = draw_networkx_labels(G, pos, chart = chart, layer = None if df_nodes is None else alt.Chart(nodes.data), subset = node_subset if df_nodes is None else None, # reuse the already-subset node rows
                 label = node_label, font_size = node_font_size, font_colour = node_font_colour,
                 mark_kwargs = node_label_mark_kwargs, encode_kwargs = node_label_encode_kwargs)
             layers.append(labels)
@@ -698,9 +825,12 @@ def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None
 
     if layers:
         # Extract the coordinate ranges from the layers which are present (since drawn elements, e.g. self-loops or large node sizes, might not match node coordinate ranges)
-        min_xs, max_xs, min_ys, max_ys = zip(*((min(l.data['x']), max(l.data['x']), min(l.data['y']), max(l.data['y'])) for l in layers))
-        x_range = (max_x := max(max_xs)) - (min_x := min(min_xs))
-        y_range = (max_y := max(max_ys)) - (min_y := min(min_ys))
+        #   The labels layer (if any) shares the nodes' rows, hence only distinct dataframes are scanned, as a single coordinate array
+        dfs = {id(l.data): l.data for l in layers}
+        xy = np.concatenate([df[['x', 'y']].to_numpy(dtype = float) for df in dfs.values()])
+        if not len(xy): raise ValueError('nothing to draw: the node and edge subsets exclude every node and edge, so the axes\' domains cannot be computed.')
+        (min_x, min_y), (max_x, max_y) = xy.min(axis = 0).tolist(), xy.max(axis = 0).tolist()
+        x_range, y_range = max_x - min_x, max_y - min_y
 
         # Compute new coordinate ranges with uniform padding AND s.t. the aspect ratio matches the required one
         #   It is cleaner to work in terms of longer and shorter sides rather than real x and y; reassign at the end
@@ -714,10 +844,16 @@ def draw_networkx(G: nx.Graph = None, pos: dict[..., tuple[float, float]] = None
 
         x_padding, y_padding = (long_padding, short_padding) if chart_width >= chart_height else (short_padding, long_padding)
 
-        return alt.layer(*layers).encode(
-            alt.X().scale(domain = (min_x - x_padding, max_x + x_padding)),
-            alt.Y().scale(domain = (min_y - y_padding, max_y + y_padding))
-        ).properties(width = chart_width, height = chart_height)
+        # Only now replace the layers' data with file references, since their dataframes were needed up to this point
+        if data_url_prefix is not None:
+            urls = {k: _url_data(df, f'{data_url_prefix}{i}.json') for i, (k, df) in enumerate(dfs.items())}
+            for l in layers: _reference_data(l, urls[id(l.data)])
+
+        # Equivalent to `alt.layer(*layers).encode(...).properties(...)`, but without the intermediate chart copies and per-property validation (the whole spec is validated on output anyway)
+        return alt.LayerChart(layer = layers, width = chart_width, height = chart_height, encoding = alt.FacetedEncoding(
+            x = alt.X(scale = alt.Scale(domain = (min_x - x_padding, max_x + x_padding))),
+            y = alt.Y(scale = alt.Scale(domain = (min_y - y_padding, max_y + y_padding)))
+        ))
     else: raise ValueError('G does not contain any nodes or edges.')
 
 
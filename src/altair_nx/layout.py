@@ -0,0 +1,187 @@
+import numpy as np
+import networkx as nx
+import os
+import pickle
+
+from pathlib import Path
+from hashlib import blake2b
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+
+def _kamada_kawai_layout(G: nx.Graph):
+    '''`nx.kamada_kawai_layout` (with default arguments), but starting from a cheap layout closer to its result than its default circular one for graphs of more than 50 nodes,
+    which takes its optimisation fewer iterations to converge: the (slightly jittered) spectral layout for connected graphs, and shell layouts of each connected component side by side otherwise
+    (since spectral layouts of disconnected graphs place whole components on single points, which the optimisation cannot separate).
+    Graphs of more than 500 nodes are laid out by _sparse_kamada_kawai_layout instead.
+    '''
+    if len(G) <= 50: return nx.drawing.layout.kamada_kawai_layout(G)
+
+    U = G.to_undirected(as_view = True)
+    if nx.is_connected(U):
+        # Structurally equivalent nodes (e.g. the leaves of a star) have identical spectral coordinates, which the optimisation cannot separate (their gradient vanishes);
+        #   a little deterministic jitter breaks such ties without changing the seed's overall shape
+        initial = nx.drawing.layout.spectral_layout(U)
+        P = np.array(list(initial.values()))
+        P += np.random.default_rng(0).normal(scale = 1e-3 * np.ptp(P, axis = 0).max(), size = P.shape)
+        initial = dict(zip(initial, P))
+    else:
+        initial = {}
+        for i, component in enumerate(sorted(nx.connected_components(U), key = len, reverse = True)):
+            initial.update(nx.drawing.layout.shell_layout(nx.subgraph_view(U, filter_node = component.__contains__), center = (2.5 * i, 0))) # in G's node order, unlike U.subgraph(component)
+    return _sparse_kamada_kawai_layout(G, initial) if len(G) > 500 else nx.drawing.layout.kamada_kawai_layout(G, pos = initial)
+
+
+
+def _sparse_kamada_kawai_layout(G: nx.Graph, initial: dict, radius = 3):
+    '''Kamada-Kawai layout of G (with edge 'weight's as lengths, 1 by default) which only considers node pairs within radius (typical) edge lengths of each other,
+    hence optimising over a sparse list of pairs rather than all of them (whose dense distance matrix makes `nx.kamada_kawai_layout` impractical beyond a few hundred nodes);
+    the global structure comes from the initial positions instead. Unlike `nx.kamada_kawai_layout`, distances in directed graphs ignore edge directions.
+    '''
+    from scipy.sparse import csr_array # like nx.kamada_kawai_layout, this requires scipy
+    from scipy.sparse.csgraph import dijkstra
+    from scipy.optimize import minimize
+
+    nodes = list(G)
+    index = {n: i for i, n in enumerate(nodes)}
+    lengths = {} # the shortest of any parallel edges
+    for u, v, w in G.edges(data = 'weight', default = 1):
+        if u != v: lengths[key] = min(w, lengths.get(key := (index[u], index[v]), w))
+    if not lengths: return nx.drawing.layout.kamada_kawai_layout(G, pos = initial) # nothing to optimise
+
+    edge_ij = np.array(list(lengths)).T
+    edge_lengths = np.fromiter(lengths.values(), dtype = float, count = len(lengths))
+    A = csr_array((edge_lengths, tuple(edge_ij)), shape = (len(nodes), len(nodes)))
+    limit = radius * np.median(edge_lengths)
+
+    # Distances from a batch of sources at a time, keeping only the pairs within the limit, so that no more than a (batch_size, n_nodes) block is ever stored densely
+    batch_size = max(1, 2 ** 20 // len(nodes))
+    pairs = []
+    for start in range(0, len(nodes), batch_size):
+        D = dijkstra(A, directed = False, indices = np.arange(start, min(start + batch_size, len(nodes))), limit = limit)
+        bi, j = np.nonzero(np.isfinite(D) & (D > 0))
+        keep = bi + start < j
+        pairs.append((bi[keep] + start, j[keep], D[bi[keep], j[keep]]))
+    i, j, d = (np.concatenate(column) for column in zip(*pairs))
+    w = d ** -2
+
+    # Start from the initial layout scaled to the edge lengths, which L-BFGS would otherwise spend iterations on
+    P = np.array([initial[n] for n in nodes], dtype = float)
+    P *= edge_lengths.mean() / np.linalg.norm(P[edge_ij[0]] - P[edge_ij[1]], axis = 1).mean()
+
+    def stress(x: np.ndarray):
+        P = x.reshape(-1, 2)
+        delta = P[i] - P[j] # (n_pairs, 2)
+        dist = np.sqrt((delta ** 2).sum(axis = 1))
+        residual = dist - d
+        pair_grad = (w * residual / np.maximum(dist, 1e-9))[:, None] * delta
+        grad = np.column_stack([np.bincount(i, weights = g, minlength = len(P)) - np.bincount(j, weights = g, minlength = len(P)) for g in pair_grad.T]) # much faster than np.add.at
+        return (w * residual ** 2).sum() / 2, grad.ravel()
+
+    P = minimize(stress, P.ravel(), method = 'L-BFGS-B', jac = True).x.reshape(-1, 2)
+    return dict(zip(nodes, nx.drawing.layout.rescale_layout(P)))
+
+
+
+LAYOUT_ALGORITHMS = dict(
+    kamada_kawai = _kamada_kawai_layout,
+    spring = nx.drawing.layout.spring_layout,
+    spectral = nx.drawing.layout.spectral_layout,
+    random = nx.drawing.layout.random_layout,
+)
+
+_LAYOUT_CACHE: WeakKeyDictionary[nx.Graph, tuple[tuple, dict]] = WeakKeyDictionary()
+_TOPOLOGY_CACHE: OrderedDict[bytes, tuple[tuple, dict]] = OrderedDict()
+_TOPOLOGY_CACHE_SIZE = 32
+
+
+def _layout_signature(G: nx.Graph):
+    '''Cheap (linear-time) summary of everything in G which affects its default layout, i.e. its type (directed and/or multigraph), its nodes (in order, since it determines the starting positions),
+    edges and edge weights.
+    '''
+    return G.is_directed(), G.is_multigraph(), tuple(G.nodes), tuple(G.edges(data = 'weight'))
+
+
+
+def _fingerprint(signature: tuple):
+    '''Fixed-size digest of a layout signature, usable as a key even if some edge weights are unhashable.
+    '''
+    return blake2b(repr(signature).encode(), digest_size = 16).digest()
+
+
+
+def _read_layout_file(cache_dir: str | Path, key: bytes, signature: tuple):
+    '''The layout stored in cache_dir for the given key if there is one and it is for the same signature
+    (None otherwise, including if the file is unreadable or does not contain a stored layout).
+    '''
+    try:
+        with (Path(cache_dir) / f'{key.hex()}.pkl').open('rb') as f: stored = pickle.load(f)
+    except Exception: return None # any corrupt or foreign file is simply a miss, since unpickling can raise almost anything
+    return stored.get('pos') if isinstance(stored, dict) and stored.get('signature') == signature else None
+
+
+
+def _write_layout_file(cache_dir: str | Path, key: bytes, signature: tuple, pos: dict):
+    '''Store a layout in cache_dir under the given key, replacing the file atomically so that concurrent readers never see partial ones.
+    This is best-effort: if the layout cannot be written (e.g. because its nodes cannot be pickled) it is simply not stored, and no temporary file is left behind.
+    '''
+    path = Path(cache_dir) / f'{key.hex()}.pkl'
+    temp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        path.parent.mkdir(parents = True, exist_ok = True)
+        with temp_path.open('wb') as f: pickle.dump(dict(signature = signature, pos = pos), f, protocol = pickle.HIGHEST_PROTOCOL)
+        temp_path.replace(path)
+    except Exception: temp_path.unlink(missing_ok = True)
+
+
+
+def _auto_algorithm(G: nx.Graph):
+    '''The layout algorithm which 'auto' stands for given the size of G: Kamada-Kawai up to 500 nodes, spring up to 5000, and spectral above that if G is (weakly) connected, random otherwise
+    (since spectral layouts place whole components on single points); Kamada-Kawai's all-pairs shortest paths and optimisation, and then spring's iterations,
+    quickly become the dominant drawing cost (tens of seconds at a few thousand nodes).
+    '''
+    if len(G) <= 500: return 'kamada_kawai'
+    if len(G) <= 5000: return 'spring'
+    return 'spectral' if (nx.is_weakly_connected if G.is_directed() else nx.is_connected)(G) else 'random'
+
+
+
+def default_layout(G: nx.Graph, algorithm = 'auto', cache = True, cache_dir: str | Path = None):
+    '''Compute the default node positions of G, reusing a previous result for the same graph structure (and algorithm) if available.
+    Since layouts are at least quadratic in the number of nodes, this avoids recomputing them when drawing the same graph multiple times (e.g. one layer at a time),
+    including through different but structurally identical graph objects (e.g. copies of it); the most recent 32 structures are kept.
+
+    :param G: The graph to lay out.
+    :param algorithm: Either 'auto' (the default; `nx.kamada_kawai_layout` for up to 500 nodes, `nx.spring_layout` for up to 5000 and `nx.spectral_layout` above that,
+        or `nx.random_layout` if G is disconnected) or a key of LAYOUT_ALGORITHMS ('kamada_kawai', 'spring', 'spectral' or 'random'); all are called with default arguments,
+        except for Kamada-Kawai's initial positions for graphs of more than 50 nodes (see _kamada_kawai_layout).
+        Since Kamada-Kawai is at least quadratic in the number of nodes, explicitly requesting it for graphs of more than 2000 nodes raises a ValueError rather than running for minutes.
+    :param cache: Whether to look up and store the result in the layout caches; if False the layout is always recomputed.
+    :param cache_dir: If not None (and cache is True), a directory in which layouts are also stored as pickle files (one per graph structure and algorithm), for reuse across sessions;
+        since loading pickles can execute arbitrary code, it should only ever contain files written by this function.
+
+    :return: A dictionary of node positions; it is shared between calls, so it should not be mutated.
+    '''
+    if algorithm == 'auto': algorithm = _auto_algorithm(G)
+    elif algorithm not in LAYOUT_ALGORITHMS: raise ValueError(f'algorithm must be \'auto\' or one of {list(LAYOUT_ALGORITHMS)}; got {algorithm!r}.')
+    elif algorithm == 'kamada_kawai' and len(G) > 2000: raise ValueError(f'the Kamada-Kawai layout would take too long (minutes) for a graph of {len(G)} nodes (over 2000); pass pos or a faster algorithm (e.g. \'auto\') instead.')
+    if not cache: return LAYOUT_ALGORITHMS[algorithm](G)
+
+    signature = (algorithm, _layout_signature(G))
+    if (cached := _LAYOUT_CACHE.get(G)) is not None and cached[0] == signature: return cached[1]
+
+    key = _fingerprint(signature)
+    if (cached := _TOPOLOGY_CACHE.get(key)) is not None and cached[0] == signature: # also compare the signatures themselves, since node reprs need not be unique
+        _TOPOLOGY_CACHE.move_to_end(key)
+        pos = cached[1]
+    else:
+        if cache_dir is None or (pos := _read_layout_file(cache_dir, key, signature)) is None:
+            pos = LAYOUT_ALGORITHMS[algorithm](G)
+            if cache_dir is not None: _write_layout_file(cache_dir, key, signature, pos)
+        _TOPOLOGY_CACHE[key] = (signature, pos)
+        if len(_TOPOLOGY_CACHE) > _TOPOLOGY_CACHE_SIZE: _TOPOLOGY_CACHE.popitem(last = False)
+
+    _LAYOUT_CACHE[G] = (signature, pos)
+    return pos
+
+
@@ -8,8 +8,8 @@ def copy_size_and_axes(source_chart: alt.Chart, target_chart: alt.Chart):
     This is useful to preserve the drawn aspect ratio when reassembling or concatenating layers with other charts.
     '''
     return target_chart.encode(
-        alt.X().scale(domain = source_chart.encoding.x['scale']['domain']),
-        alt.Y().scale(domain = source_chart.encoding.y['scale']['domain'])
+        alt.X(scale = alt.Scale(domain = source_chart.encoding.x['scale']['domain'])),
+        alt.Y(scale = alt.Scale(domain = source_chart.encoding.y['scale']['domain']))
     ).properties(width = source_chart.width, height = source_chart.height)
 
 
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from math import atan2, cos, pi, sin, sqrt
+
+import networkx as nx
+import pandas as pd
+import pytest
+
+from altair_nx.core import to_pandas_edges
+
+
+def row_wise_edges(G, pos, control_points = None, loop_radius = .05, loop_angle = 90., loop_n_points = 30):
+    '''The original one-dict-per-row construction of to_pandas_edges, as a reference for the vectorised one.'''
+    loop_angle *= pi / 180
+    rows = []
+    for i, e in enumerate(G.edges):
+        (x0, y0), (x1, y1) = pos[e[0]], pos[e[1]]
+        D, angle = sqrt((x1 - x0) ** 2 + (y1 - y0) ** 2), atan2(y1 - y0, x1 - x0)
+        points = [(x0, y0)]
+        if e[0] == e[1]:
+            centre_x, centre_y = x0 + loop_radius * cos(loop_angle), y0 + loop_radius * sin(loop_angle)
+            for n in range(1, loop_n_points):
+                point_angle = (loop_angle - pi + n * 2 * pi / loop_n_points) % (2 * pi)
+                points.append((centre_x + loop_radius * cos(point_angle), centre_y + loop_radius * sin(point_angle)))
+        elif control_points:
+            points += [(x0 + D * (v * cos(angle) - w * sin(angle)), y0 + D * (v * sin(angle) + w * cos(angle))) for v, w in control_points]
+        points.append((x1, y1))
+        rows += [dict(edge = i, order = order, source = e[0], target = e[1], pair = e, x = x, y = y, **G.edges[e]) for order, (x, y) in enumerate(points)]
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('control_points', [None, [], [(.5, .1)], [(.25, -.2), (.75, .3)]])
+@pytest.mark.parametrize('loop_n_points', [3, 30])
+def test_to_pandas_edges_matches_row_wise(control_points, loop_n_points):
+    G = nx.MultiDiGraph([('a', 'b'), ('b', 'c'), ('c', 'c'), ('c', 'a'), ('a', 'b'), ('b', 'b')])
+    nx.set_edge_attributes(G, {e: dict(weight = i) for i, e in enumerate(G.edges)})
+    pos = nx.circular_layout(G)
+
+    new = to_pandas_edges(G, pos, control_points = control_points, loop_radius = .1, loop_angle = 45., loop_n_points = loop_n_points)
+    new = new.astype({c: object for c in new.columns if isinstance(new[c].dtype, pd.CategoricalDtype)})
+    old = row_wise_edges(G, pos, control_points = control_points, loop_radius = .1, loop_angle = 45., loop_n_points = loop_n_points)
+    pd.testing.assert_frame_equal(new, old, check_dtype = False)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+
+import networkx as nx
+import numpy as np
+
+import altair_nx as anx
+
+
+def test_data_url_writes_file_and_keeps_types(tmp_path):
+    G = nx.path_graph(4)
+    nx.set_node_attributes(G, {n: dict(kind = 'ab'[n % 2]) for n in G})
+    url = str(tmp_path / 'nodes.json')
+
+    spec = anx.draw_networkx_nodes(G, colour = 'kind', data_url = url).to_dict()
+    assert spec['data']['url'] == url
+    assert [row['node'] for row in json.loads((tmp_path / 'nodes.json').read_text())] == list(G)
+    assert spec['encoding']['fill']['type'] == 'nominal'
+    assert spec['encoding']['x']['type'] == spec['encoding']['y']['type'] == 'quantitative'
+
+
+def test_data_url_prefix_writes_one_file_per_distinct_layer(tmp_path):
+    G = nx.path_graph(4)
+    spec = anx.draw_networkx(G, node_label = 'node', data_url_prefix = str(tmp_path / 'layer')).to_dict()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['layer0.json', 'layer1.json'] # the labels reuse the nodes' file
+    assert {layer['data']['url'] for layer in spec['layer']} == {str(tmp_path / 'layer0.json'), str(tmp_path / 'layer1.json')}
+
+
+def test_hidden_orphans_keep_graph_order():
+    G = nx.Graph()
+    G.add_nodes_from(f'isolated{i}' for i in range(30)) # far more orphans than drawn nodes
+    G.add_edges_from((f'n{i}', f'n{i + 1}') for i in range(11))
+    G.add_edges_from([('n0', 'n0'), ('n3', 'n7')])
+
+    for show_self_loops in (True, False):
+        edges, nodes = anx.draw_networkx(G, show_orphans = False, show_self_loops = show_self_loops).layer
+        assert list(nodes.data['node']) == [n for n in G if n.startswith('n')]
+        assert list(edges.data.drop_duplicates('edge')['pair']) == [e for e in G.edges if show_self_loops or e[0] != e[1]]
+
+
+def test_pos_as_nodes_and_array_matches_dict():
+    G = nx.les_miserables_graph()
+    pos = nx.spring_layout(G, seed = 1)
+    nodes = list(G)[::-1] # need not follow G's order
+    from_dict = anx.draw_networkx(G, pos = pos, node_label = 'node').to_dict()
+    from_array = anx.draw_networkx(G, pos = (nodes, np.array([pos[n] for n in nodes])), node_label = 'node').to_dict()
+    assert from_array == from_dict
+
+
+def test_rescale_pos_false_draws_coordinates_as_given():
+    G = nx.path_graph(5)
+    pos = {n: (2. * n, (n - 2) ** 2) for n in G} # x range 8, y range 4
+    chart = anx.draw_networkx(G, pos = pos, rescale_pos = False)
+    nodes = chart.layer[1].data
+    assert list(zip(nodes['x'], nodes['y'])) == [pos[n] for n in G]
+
+    assert anx.draw_networkx(G, pos = pos, rescale_pos = False, chart_height = None).height == 500. * 4 / 8
+    assert anx.draw_networkx(G, pos = pos, rescale_pos = False, chart_width = None).width == 300. * 8 / 4
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+import pickle
+import subprocess
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from altair_nx import layout
+from altair_nx.layout import default_layout
+
+
+def cycle(n = 30):
+    G = nx.path_graph(n)
+    G.add_edge(0, n - 1)
+    return G
+
+
+def test_cache_reuses_layouts_of_same_structure():
+    G = cycle()
+    pos = default_layout(G)
+    assert default_layout(G) is pos
+    assert default_layout(G.copy()) is pos # structurally identical graphs share it
+    assert default_layout(G, cache = False) is not pos
+
+
+def test_cache_is_invalidated_by_changes():
+    G = cycle()
+    pos = default_layout(G)
+
+    G.add_edge(0, 15)
+    assert default_layout(G) is not pos
+    G.remove_edge(0, 15)
+    G.edges[0, 1]['weight'] = 3
+    assert default_layout(G) is not pos
+    assert default_layout(cycle(), algorithm = 'spring') is not pos
+
+
+def test_cache_separates_graph_types():
+    G = cycle()
+    pos = default_layout(G)
+    for graph_type in (nx.DiGraph, nx.MultiGraph):
+        H = graph_type()
+        H.add_nodes_from(G) # same node order, hence the same signature but for the graph type
+        H.add_edges_from(G.edges)
+        other = default_layout(H)
+        assert other is not pos
+        uncached = default_layout(H, cache = False)
+        assert all(np.allclose(other[n], uncached[n]) for n in H)
+
+
+def test_topology_cache_is_bounded():
+    for n in range(10, 10 + layout._TOPOLOGY_CACHE_SIZE + 5): default_layout(nx.path_graph(n))
+    assert len(layout._TOPOLOGY_CACHE) == layout._TOPOLOGY_CACHE_SIZE
+
+
+def fresh_memory_caches(monkeypatch):
+    '''Simulate a new session by emptying the in-memory layout caches.'''
+    monkeypatch.setattr(layout, '_TOPOLOGY_CACHE', type(layout._TOPOLOGY_CACHE)())
+    monkeypatch.setattr(layout, '_LAYOUT_CACHE', type(layout._LAYOUT_CACHE)())
+
+
+def test_cache_dir_reuses_layouts_across_sessions(tmp_path, monkeypatch):
+    fresh_memory_caches(monkeypatch)
+    pos = default_layout(cycle(), cache_dir = tmp_path)
+    assert [p.suffix for p in tmp_path.iterdir()] == ['.pkl']
+
+    fresh_memory_caches(monkeypatch)
+    def fail(G): raise AssertionError('the layout should have been read from cache_dir')
+    monkeypatch.setitem(layout.LAYOUT_ALGORITHMS, 'kamada_kawai', fail)
+    stored = default_layout(cycle(), cache_dir = tmp_path)
+    assert all(np.array_equal(stored[n], pos[n]) for n in pos)
+
+
+def test_cache_dir_treats_bad_files_as_misses(tmp_path, monkeypatch):
+    fresh_memory_caches(monkeypatch)
+    default_layout(cycle(), cache_dir = tmp_path)
+    path, = tmp_path.iterdir()
+    for contents in (b'not a pickle', pickle.dumps([1, 2]), pickle.dumps(dict(signature = 'another graph', pos = {}))):
+        path.write_bytes(contents)
+        fresh_memory_caches(monkeypatch)
+        assert len(default_layout(cycle(), cache_dir = tmp_path)) == 30
+        assert pickle.loads(path.read_bytes())['signature'] != 'another graph' # and the file is rewritten
+
+
+class Unpicklable:
+    def __reduce__(self): raise TypeError('cannot pickle this node')
+
+
+def test_cache_dir_skips_unpicklable_layouts(tmp_path):
+    G = nx.Graph([(Unpicklable(), 1), (1, 2)])
+    assert len(default_layout(G, cache_dir = tmp_path)) == 3
+    assert list(tmp_path.iterdir()) == [] # no leftover temporary file
+
+
+@pytest.mark.parametrize('G', [nx.barbell_graph(30, 5), nx.connected_caveman_graph(6, 10), nx.star_graph(60), nx.connected_caveman_graph(30, 20)])
+def test_kamada_kawai_separates_equivalent_nodes(G):
+    pos = default_layout(G, algorithm = 'kamada_kawai', cache = False) # over 50 nodes, hence starting from the spectral layout (and over 500 for the sparse solver)
+    assert len({tuple(np.round(p, 6)) for p in pos.values()}) == len(G)
+
+
+def test_kamada_kawai_of_disconnected_graphs_ignores_string_hashing():
+    code = '''if True:
+        import networkx as nx
+        from altair_nx.layout import default_layout
+        G = nx.relabel_nodes(nx.disjoint_union_all([nx.cycle_graph(5)] * 15), lambda n: f'v{n}') # small components of string nodes
+        print(repr([tuple(p) for p in default_layout(G, cache = False).values()]))
+    '''
+    outputs = {subprocess.run([sys.executable, '-c', code], env = os.environ | dict(PYTHONHASHSEED = seed), capture_output = True, text = True, check = True).stdout
+        for seed in ('1', '2', '3')}
+    assert len(outputs) == 1
+
+
+def test_auto_algorithm_avoids_spectral_for_large_disconnected_graphs():
+    assert layout._auto_algorithm(nx.path_graph(6000)) == layout._auto_algorithm(nx.path_graph(6000, create_using = nx.DiGraph)) == 'spectral'
+    G = nx.gnm_random_graph(6000, 5000, seed = 1)
+    assert layout._auto_algorithm(G) == 'random'
+    assert len({tuple(p) for p in default_layout(G, cache = False).values()}) == len(G)
+
+
+def normalised_stress(G, pos):
+    '''Kamada-Kawai's (scale-normalised) stress of pos over the connected pairs of G.'''
+    nodes = list(G)
+    P = np.array([pos[n] for n in nodes])
+    P /= np.mean([np.linalg.norm(pos[u] - pos[v]) for u, v in G.edges])
+    distances = dict(nx.all_pairs_shortest_path_length(G))
+    pairs = [(a, b, distances[u][v]) for a, u in enumerate(nodes) for b, v in enumerate(nodes[:a]) if v in distances[u]]
+    i, j, d = np.array(pairs).T
+    return np.mean((np.linalg.norm(P[i.astype(int)] - P[j.astype(int)], axis = 1) - d) ** 2 / d ** 2)
+
+
+@pytest.mark.parametrize('G', [nx.grid_2d_graph(8, 8), nx.random_labeled_tree(60, seed = 2), nx.connected_caveman_graph(5, 6)])
+def test_sparse_kamada_kawai_matches_networkx(G):
+    reference = normalised_stress(G, nx.kamada_kawai_layout(G))
+    # Considering all pairs (i.e. a radius of at least the diameter) and starting from networkx's default circular layout, the optimum should be as good
+    full = layout._sparse_kamada_kawai_layout(G, nx.circular_layout(G), radius = nx.diameter(G))
+    assert normalised_stress(G, full) <= 1.01 * reference
+
+
+def test_sparse_kamada_kawai_of_disconnected_graphs_and_isolates():
+    G = nx.disjoint_union_all([nx.grid_2d_graph(5, 5), nx.cycle_graph(10)])
+    G.add_nodes_from(['a', 'b', 'c'])
+    components = sorted(nx.connected_components(G), key = len, reverse = True)
+    initial = {n: (10. * i, 0.) for i, component in enumerate(components) for n in component} # well apart, for the components to keep their own space
+    initial.update(nx.circular_layout(G.subgraph(components[0]), center = (0, 0)))
+    initial.update(nx.circular_layout(G.subgraph(components[1]), center = (10, 0)))
+
+    pos = layout._sparse_kamada_kawai_layout(G, initial, radius = 10)
+    P = np.array([pos[n] for n in G])
+    assert np.isfinite(P).all() and len({tuple(p) for p in P}) == len(G)
+    boxes = [(np.array([pos[n] for n in c]).min(axis = 0), np.array([pos[n] for n in c]).max(axis = 0)) for c in components]
+    assert all(boxes[k][1][0] < boxes[k + 1][0][0] for k in range(len(boxes) - 1)) # components stay side by side, as initially
+    for component in components[:2]:
+        H = G.subgraph(component)
+        assert normalised_stress(H, pos) <= 1.01 * normalised_stress(H, nx.kamada_kawai_layout(H))
+
+
+def test_explicit_kamada_kawai_is_refused_for_large_graphs(monkeypatch):
+    monkeypatch.setattr(layout, 'LAYOUT_ALGORITHMS', {name: lambda G: {} for name in layout.LAYOUT_ALGORITHMS}) # nothing is actually laid out
+    G = nx.empty_graph(2001)
+    with pytest.raises(ValueError, match = 'Kamada-Kawai'): default_layout(G, algorithm = 'kamada_kawai', cache = False)
+    default_layout(G, cache = False)
+    default_layout(nx.empty_graph(2000), algorithm = 'kamada_kawai', cache = False)